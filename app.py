@@ -1,13 +1,27 @@
-from flask import Flask, request, jsonify, abort
+from flask import Flask, request, abort, Response, stream_with_context
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta, timezone
 import time
-import json
-from functools import lru_cache
+import gzip
+import zlib
+import hashlib
+import orjson
+import threading
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import os
+import re
 import logging
+import numpy as np
 from dotenv import load_dotenv
 
+try:
+    import redis
+except ImportError:  # Redis is optional; caches fall back to process memory
+    redis = None
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,9 +38,15 @@ class Config:
     # API Configuration
     ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
     MORALIS_API_KEY = os.getenv("MORALIS_API_KEY")
+    FLASK_DEV = os.getenv("FLASK_DEV") == "1"  # Allow the Werkzeug dev server for local development
     
     # Etherscan V2 API base URL
     ETHERSCAN_API_URL = "https://api.etherscan.io/v2/api"
+    ETHERSCAN_RATE_LIMIT = 5  # Calls per second allowed for the API key, split across worker processes
+    # Worker processes sharing the key: the dev server runs one, Gunicorn as in gunicorn.conf.py
+    WORKER_PROCESSES = 1 if FLASK_DEV else int(os.getenv("GUNICORN_WORKERS", "2"))
+    ETHERSCAN_RATE_LIMIT_RETRIES = 3  # Retries after a "Max rate limit reached" response
+    ETHERSCAN_RATE_LIMIT_BACKOFF = 1.0  # Seconds before the first retry, doubled each time
     
     # Moralis API URL
     MORALIS_API_URL = "https://deep-index.moralis.io/api/v2.2"
@@ -37,12 +57,46 @@ class Config:
         "optimism": "optimism"
     }
     
+    # Chains covered by the Moralis wallet activity probe (zkSync is not supported)
+    MORALIS_ACTIVITY_CHAINS = {
+        "eth": "eth",
+        "arbitrum": "arbitrum",
+        "base": "base",
+        "optimism": "optimism",
+        "bsc": "bsc",
+        "polygon": "polygon",
+        "linea": "linea"
+    }
+    
+    # HTTP connection pool and retry settings
+    HTTP_POOL_SIZE = 16
+    HTTP_TIMEOUT = 10  # Seconds to wait on any upstream API call
+    HTTP_RETRIES = 2
+    HTTP_RETRY_BACKOFF = 0.3
+    HTTP_RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    # Response compression settings
+    GZIP_MIN_SIZE = 1024  # Smaller bodies are not worth compressing
+    GZIP_LEVEL = 5
+    INDEX_CACHE_MAX_AGE = 300  # Let browsers reuse index.html for 5 minutes, then revalidate by ETag
+    
     # Caching settings
+    REDIS_URL = os.getenv("REDIS_URL")  # Optional shared cache across workers and restarts
+    REDIS_NAMESPACE = "mygas"
+    REDIS_RETRY_AFTER = 30  # Seconds to skip Redis after a failed call
     PRICE_CACHE_TTL = 3600  # 1 hour in seconds
+    PRICE_PREFETCH_INTERVAL = 30  # Check for stale or expiring prices every 30 seconds
+    PRICE_PREFETCH_WINDOW = 600  # Refresh prices expiring within 10 minutes
+    PRICE_COLD_FETCH_INTERVAL = 60  # After a fetch leaves the cache empty, wait a minute before fetching inline again
+    PRICE_RETRY_BACKOFF = 600  # Wait 10 minutes before retrying a chain whose price fetch failed
+    PRICE_REFRESH_LOCK_TTL = 60  # Only one worker refreshes shared prices per minute
+    TX_CACHE_TTL = 30  # Transaction lists go stale quickly
+    BLOCK_CACHE_TTL = 6 * 3600  # Start block of the history window
     API_CACHE_SIZE = 100
     
     # Transaction query settings
     MAX_TX_LIMIT = 100
+    FETCH_WORKERS = 8  # Concurrent per-chain API requests
     HISTORY_DAYS = 90
     
     # Supported chains mapping
@@ -95,6 +149,26 @@ class Config:
         "zircuit": "https://explorer.zircuit.com/tx/"
     }
     
+    # CoinGecko price IDs for each chain's native token
+    COINGECKO_PRICE_URL = "https://api.coingecko.com/api/v3/simple/price"
+    COINGECKO_IDS = {
+        "eth": "ethereum",
+        "arbitrum": "ethereum",  # Uses ETH
+        "base": "ethereum",      # Uses ETH
+        "optimism": "ethereum",  # Uses ETH
+        "bsc": "binancecoin",
+        "polygon": "matic-network",
+        "zksync": "ethereum",    # Uses ETH
+        "linea": "ethereum"      # Uses ETH
+    }
+    
+    # Ethereum mainnet ERC-20 contracts for Moralis bulk price lookups, by CoinGecko ID
+    MORALIS_PRICE_TOKENS = {
+        "ethereum": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
+        "binancecoin": "0xB8c77482e45F1F44dE1745F52C74426C631bDD52",  # BNB
+        "matic-network": "0x7D1AfA7B718fb893dB30A3aBc0Cfc608AaCfeBB0"  # MATIC
+    }
+    
     # Native token addresses (wrapped versions for price lookup)
     TOKEN_CONTRACTS = {
         "eth": "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2",  # WETH
@@ -107,39 +181,329 @@ class Config:
         "linea": "0xe5D7C2a44FfDDf6b295A15c148167daaAf5Cf34f",  # WETH on Linea
     }
 
+# Matches a whole 0x-prefixed 20-byte hex address; bound once so each check is a single C call
+match_address = re.compile(r"0x[0-9a-fA-F]{40}").fullmatch
+
+# Chains served by Moralis instead of Etherscan
+MORALIS_CHAINS_SET = frozenset(Config.MORALIS_CHAINS)
+
+# (chain_id, display_name) pairs that have a data source, in display order
+ACTIVE_CHAINS = tuple(
+    (chain_id, chain_name) for chain_id, chain_name in Config.SUPPORTED_CHAINS.items()
+    if chain_id in MORALIS_CHAINS_SET or chain_id in Config.CHAIN_IDS
+)
+
+# Per-chain lookup records, resolved once at import:
+# chain_id -> (display_name, native_symbol, explorer_base, is_moralis, is_eth_based)
+CHAIN_DISPATCH = {
+    chain_id: (
+        chain_name,
+        Config.NATIVE_TOKENS.get(chain_id, "GAS"),
+        Config.EXPLORERS.get(chain_id, ""),
+        chain_id in MORALIS_CHAINS_SET,
+        Config.NATIVE_TOKENS.get(chain_id) == "ETH"
+    )
+    for chain_id, chain_name in ACTIVE_CHAINS
+}
+
 # Initialize Flask application
 app = Flask(__name__)
 
+def create_redis_client():
+    """Connect to Redis when REDIS_URL is configured, otherwise return None"""
+    if not Config.REDIS_URL:
+        return None
+    if redis is None:
+        logger.warning("REDIS_URL is set but the redis package is not installed")
+        return None
+    
+    try:
+        client = redis.Redis.from_url(Config.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+        client.ping()
+        logger.info("Using Redis for shared caching")
+        return client
+    except redis.RedisError as e:
+        logger.warning(f"Redis unavailable, using in-memory caches only: {e}")
+        return None
+
+# Initialize optional Redis connection
+redis_client = create_redis_client()
+
+class RedisCircuitBreaker:
+    """Skips Redis for a while after a failure so an outage doesn't add a timeout to every cache call"""
+    def __init__(self, retry_after=Config.REDIS_RETRY_AFTER):
+        self.retry_after = retry_after
+        self.open_until = 0.0
+    
+    def available(self):
+        """Whether Redis calls should be attempted"""
+        return time.monotonic() >= self.open_until
+    
+    def trip(self):
+        """Record a failed Redis call, skipping Redis until retry_after seconds have passed"""
+        if self.available():
+            logger.warning(f"Skipping Redis for {self.retry_after}s after a failure")
+        self.open_until = time.monotonic() + self.retry_after
+
+# Shared by every Redis-backed cache
+redis_breaker = RedisCircuitBreaker()
+
 # Global token price cache
 class TokenPriceCache:
-    """Caches token prices with expiration"""
-    def __init__(self, ttl_seconds=Config.PRICE_CACHE_TTL):
-        self.cache = {}
-        self.last_update = datetime.min
+    """Caches token prices with per-chain expiration, serving stale prices while they refresh
+
+    With Redis, prices are shared so that only one worker refreshes them.
+    """
+    __slots__ = ("cache", "needs_refresh", "failed", "last_update", "last_empty_fetch", "ttl_seconds", "lock", "fetch_lock", "redis", "redis_key")
+    
+    def __init__(self, ttl_seconds=Config.PRICE_CACHE_TTL, redis_client=None):
+        self.cache = {}  # chain -> (price, expiry)
+        self.needs_refresh = set()  # chains served stale since the last refresh
+        self.failed = {}  # chain -> time of the last failed price fetch
+        self.last_update = None
+        self.last_empty_fetch = float("-inf")  # when a fetch last left the cache empty
         self.ttl_seconds = ttl_seconds
+        self.lock = threading.Lock()
+        self.fetch_lock = threading.Lock()  # held while fetching so cold-path callers wait for the result
+        self.redis = redis_client
+        self.redis_key = f"{Config.REDIS_NAMESPACE}:prices"
+    
+    def expiring(self, within_seconds=0):
+        """List supported chains that are stale, missing or expire within the given window,
+        leaving out chains whose last fetch failed less than PRICE_RETRY_BACKOFF ago"""
+        now = time.time()
+        deadline = now + within_seconds
+        retry_after = now - Config.PRICE_RETRY_BACKOFF
+        with self.lock:
+            return [
+                chain for chain in Config.SUPPORTED_CHAINS
+                if (chain in self.needs_refresh or chain not in self.cache or self.cache[chain][1] <= deadline)
+                and self.failed.get(chain, retry_after) <= retry_after
+            ]
     
-    def is_expired(self):
-        """Check if the cache has expired"""
-        now = datetime.now()
-        return (now - self.last_update).total_seconds() >= self.ttl_seconds
+    def prices(self):
+        """Get all cached token prices keyed by chain, flagging stale ones for refresh"""
+        now = time.time()
+        with self.lock:
+            for chain, (price, expiry) in self.cache.items():
+                if expiry <= now:
+                    self.needs_refresh.add(chain)
+            return {chain: price for chain, (price, expiry) in self.cache.items()}
     
-    def get(self, chain):
-        """Get a token price for a chain"""
-        if self.is_expired():
+    def age(self):
+        """Seconds since prices were last updated, or None if never"""
+        if self.last_update is None:
             return None
-        return self.cache.get(chain, 0)
+        return time.time() - self.last_update
     
     def update(self, prices):
-        """Update the price cache"""
-        self.cache = prices
-        self.last_update = datetime.now()
+        """Update the price cache, keeping the stale price for failed (zero) chains"""
+        now = time.time()
+        expiry = now + self.ttl_seconds
+        with self.lock:
+            for chain, price in prices.items():
+                if price > 0:
+                    self.cache[chain] = (price, expiry)
+                    self.needs_refresh.discard(chain)
+                    self.failed.pop(chain, None)
+                    self.last_update = now
+                else:
+                    self.failed[chain] = now
+            if not self.cache:
+                self.last_empty_fetch = time.monotonic()
+        self._redis_store({chain: (price, expiry) for chain, price in prices.items() if price > 0})
+    
+    def sync(self):
+        """Merge in prices that other workers have stored in Redis"""
+        if self.redis is None or not redis_breaker.available():
+            return
+        try:
+            shared = self.redis.hgetall(self.redis_key)
+        except redis.RedisError as e:
+            redis_breaker.trip()
+            logger.warning(f"Redis price cache read failed: {e}")
+            return
+        
+        with self.lock:
+            for chain, value in shared.items():
+                chain = chain.decode()
+                price, expiry = orjson.loads(value)
+                entry = self.cache.get(chain)
+                if entry is None or entry[1] < expiry:
+                    self.cache[chain] = (price, expiry)
+                    self.needs_refresh.discard(chain)
+                    self.failed.pop(chain, None)
+                    self.last_update = max(self.last_update or 0, expiry - self.ttl_seconds)
+    
+    def cold_fetch_allowed(self):
+        """Whether an inline fetch may run, i.e. no fetch left the cache empty within PRICE_COLD_FETCH_INTERVAL"""
+        return time.monotonic() - self.last_empty_fetch >= Config.PRICE_COLD_FETCH_INTERVAL
+    
+    def claim_refresh(self):
+        """Claim the shared price refresh; only one worker wins per PRICE_REFRESH_LOCK_TTL"""
+        if self.redis is None or not redis_breaker.available():
+            return True
+        try:
+            # The lock is left to expire, so it also rate-limits retries of failed chains
+            return bool(self.redis.set(f"{self.redis_key}:lock", os.getpid(), nx=True, ex=Config.PRICE_REFRESH_LOCK_TTL))
+        except redis.RedisError as e:
+            redis_breaker.trip()
+            logger.warning(f"Redis price refresh lock failed: {e}")
+            return True
     
-    def set(self, chain, price):
-        """Set a single token price"""
-        self.cache[chain] = price
+    def _redis_store(self, entries):
+        """Share freshly fetched (price, expiry) entries through Redis"""
+        if self.redis is None or not entries or not redis_breaker.available():
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.hset(self.redis_key, mapping={chain: orjson.dumps(entry) for chain, entry in entries.items()})
+            # Keep stale prices around long enough to serve while refreshing
+            pipe.expire(self.redis_key, self.ttl_seconds * 24)
+            pipe.execute()
+        except redis.RedisError as e:
+            redis_breaker.trip()
+            logger.warning(f"Redis price cache write failed: {e}")
 
 # Initialize token price cache
-price_cache = TokenPriceCache()
+price_cache = TokenPriceCache(redis_client=redis_client)
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries expire after a TTL, optionally backed by Redis"""
+    def __init__(self, maxsize=Config.API_CACHE_SIZE, ttl_seconds=Config.TX_CACHE_TTL, redis_client=None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (value, expiry)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.redis = redis_client
+    
+    def get(self, key):
+        """Get a cached value, or None if missing or expired"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+        
+        # Fall back to the shared cache, keeping a local copy for its remaining TTL
+        shared = self._redis_get(key)
+        with self.lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        value, ttl_seconds = shared
+        self._set_local(key, value, ttl_seconds)
+        return value
+    
+    def set(self, key, value, ttl_seconds=None):
+        """Store a value, evicting entries if the cache is full"""
+        if ttl_seconds is None:
+            ttl_seconds = self.ttl_seconds
+        self._set_local(key, value, ttl_seconds)
+        self._redis_set(key, value, ttl_seconds)
+    
+    def get_or_set(self, key, loader, ttl_seconds=None, cacheable=bool):
+        """Get a cached value, loading and storing it on a miss when cacheable(value) is true"""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if cacheable(value):
+                self.set(key, value, ttl_seconds)
+        return value
+    
+    def _set_local(self, key, value, ttl_seconds):
+        """Store a value in process memory"""
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + ttl_seconds)
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self._evict()
+    
+    def _evict(self):
+        """Drop expired entries first, then the least recently used ones"""
+        now = time.monotonic()
+        expired = [key for key, (_, expiry) in self.entries.items() if expiry <= now]
+        for key in expired:
+            del self.entries[key]
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+    
+    def _redis_key(self, key):
+        """Build a Redis key such as mygas:txlist:<address>:<chain>:<from_block>"""
+        return ":".join([Config.REDIS_NAMESPACE, *map(str, key)])
+    
+    def _redis_get(self, key):
+        """Look a key up in Redis, returning (value, remaining_ttl) or None"""
+        if self.redis is None or not redis_breaker.available():
+            return None
+        try:
+            pipe = self.redis.pipeline()
+            pipe.get(self._redis_key(key))
+            pipe.pttl(self._redis_key(key))
+            raw, pttl = pipe.execute()
+        except redis.RedisError as e:
+            redis_breaker.trip()
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+        
+        if raw is None or pttl is None or pttl <= 0:
+            return None
+        return orjson.loads(raw), pttl / 1000
+    
+    def _redis_set(self, key, value, ttl_seconds):
+        """Store a value in Redis with the same TTL as the local copy"""
+        if self.redis is None or not redis_breaker.available():
+            return
+        try:
+            self.redis.setex(self._redis_key(key), max(1, int(ttl_seconds)), orjson.dumps(value))
+        except redis.RedisError as e:
+            redis_breaker.trip()
+            logger.warning(f"Redis cache write failed: {e}")
+
+# Initialize API response cache
+response_cache = TTLCache(redis_client=redis_client)
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly to stay under a per-second rate"""
+    def __init__(self, calls_per_second):
+        self.interval = 1.0 / calls_per_second
+        self.next_call = 0.0
+        self.lock = threading.Lock()
+    
+    def wait(self):
+        """Block until the next call slot is free"""
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_call - now
+            self.next_call = max(now, self.next_call) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+def create_http_session(headers=None):
+    """Create a pooled keep-alive HTTP session that retries transient errors"""
+    retries = Retry(
+        total=Config.HTTP_RETRIES,
+        backoff_factor=Config.HTTP_RETRY_BACKOFF,
+        status_forcelist=Config.HTTP_RETRY_STATUSES,
+        raise_on_status=False  # Hand the final response back to the caller
+    )
+    adapter = HTTPAdapter(
+        pool_connections=Config.HTTP_POOL_SIZE,
+        pool_maxsize=Config.HTTP_POOL_SIZE,
+        max_retries=retries
+    )
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    if headers:
+        session.headers.update(headers)
+    return session
 
 # API Client classes
 class MoralisClient:
@@ -154,13 +518,14 @@ class MoralisClient:
             "accept": "application/json",
             "X-API-Key": self.api_key
         }
+        self.session = create_http_session(self.headers)
     
     def _make_request(self, endpoint, params=None):
         """Make a request to the Moralis API with error handling"""
         url = f"{self.api_url}/{endpoint}"
         try:
             logger.info(f"Making Moralis API request to {url}")
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.session.get(url, params=params, timeout=Config.HTTP_TIMEOUT)
             
             if response.status_code != 200:
                 logger.error(f"Moralis HTTP Error: Status code {response.status_code}, Response: {response.text}")
@@ -169,9 +534,9 @@ class MoralisClient:
                 return None
             
             try:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return data
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"Moralis JSON Decode Error: {e}, Response text: {response.text[:200]}...")
                 return None
             
@@ -179,37 +544,28 @@ class MoralisClient:
             logger.error(f"Moralis Request Error: {e}")
             return None
     
-    @lru_cache(maxsize=Config.API_CACHE_SIZE)
-    def get_cached_response(self, cache_key):
-        """Cache API responses to reduce API calls"""
-        parts = cache_key.split('|')
-        if len(parts) < 2:
-            return None
-        
-        endpoint = parts[0]
-        params = json.loads(parts[1]) if len(parts) > 1 else {}
-        return self._make_request(endpoint, params)
+    def get_cached_response(self, cache_key, endpoint, build_params, ttl_seconds=Config.TX_CACHE_TTL):
+        """Cache API responses to reduce API calls, building request params only on a miss"""
+        return response_cache.get_or_set(cache_key, lambda: self._make_request(endpoint, build_params()), ttl_seconds)
     
     def get_transactions(self, address, chain, from_date=None):
         """Get native transactions for a wallet using Moralis API"""
-        if not address or not chain or chain not in Config.MORALIS_CHAINS:
+        if not address or not chain or chain not in MORALIS_CHAINS_SET:
             return []
         
-        moralis_chain = Config.MORALIS_CHAINS.get(chain)
-        endpoint = f"{address}"
-        
-        # Set up parameters
-        params = {
-            "chain": moralis_chain,
-            "limit": Config.MAX_TX_LIMIT
-        }
-        
-        # Add from_date if provided (ISO format)
-        if from_date:
-            params["from_date"] = from_date
+        def build_params():
+            params = {
+                "chain": Config.MORALIS_CHAINS.get(chain),
+                "limit": Config.MAX_TX_LIMIT
+            }
             
-        cache_key = f"{endpoint}|{json.dumps(params)}"
-        response_data = self.get_cached_response(cache_key)
+            # Add from_date if provided (ISO format)
+            if from_date:
+                params["from_date"] = from_date
+            return params
+        
+        cache_key = ("moralis_txlist", address.lower(), chain, from_date)
+        response_data = self.get_cached_response(cache_key, address, build_params)
         
         if not response_data:
             logger.warning(f"No Moralis response data for {chain}")
@@ -222,6 +578,43 @@ class MoralisClient:
         else:
             logger.warning(f"Unexpected Moralis response format for {chain}")
             return []
+    
+    def get_active_chains(self, address, chains):
+        """Get the last transaction timestamp per active Moralis chain for a wallet, or None if the probe fails"""
+        cache_key = ("moralis_active_chains", address.lower())
+        response_data = self.get_cached_response(cache_key, f"wallets/{address}/chains", lambda: {"chains": list(chains)})
+        
+        if not isinstance(response_data, dict) or not isinstance(response_data.get("active_chains"), list):
+            logger.warning(f"Unexpected Moralis active chains response for {address}")
+            return None
+        
+        return {
+            entry.get("chain"): (entry.get("last_transaction") or {}).get("block_timestamp")
+            for entry in response_data["active_chains"]
+        }
+    
+    def get_token_prices(self, token_addresses, chain="eth"):
+        """Get USD prices for several ERC-20 tokens in one bulk request, keyed by lowercase address"""
+        url = f"{self.api_url}/erc20/prices"
+        body = {"tokens": [{"token_address": address} for address in token_addresses]}
+        
+        try:
+            logger.info(f"Making Moralis bulk price request for {len(token_addresses)} tokens")
+            response = self.session.post(url, params={"chain": chain}, json=body, timeout=Config.HTTP_TIMEOUT)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+        except Exception as e:
+            logger.error(f"Error fetching prices from Moralis: {e}")
+            return {}
+        
+        if not isinstance(data, list):
+            logger.warning("Unexpected Moralis price response format")
+            return {}
+        return {
+            item["tokenAddress"].lower(): item["usdPrice"]
+            for item in data
+            if isinstance(item, dict) and item.get("tokenAddress") and item.get("usdPrice")
+        }
 
 class EtherscanClient:
     """Client for interacting with Etherscan API v2"""
@@ -231,12 +624,37 @@ class EtherscanClient:
         
         self.api_key = api_key
         self.api_url = api_url
+        self.session = create_http_session()
+        # Shared by all fetch threads; each worker process gets an equal share of the key's rate limit
+        self.rate_limiter = RateLimiter(Config.ETHERSCAN_RATE_LIMIT / max(1, Config.WORKER_PROCESSES))
     
     def _make_request(self, params):
-        """Make a request to the Etherscan API with error handling"""
+        """Make a rate-limited request to the Etherscan API, retrying rate-limit responses with backoff"""
+        for attempt in range(Config.ETHERSCAN_RATE_LIMIT_RETRIES + 1):
+            data = self._send_request(params)
+            if not self._is_rate_limited(data):
+                return data
+            if attempt < Config.ETHERSCAN_RATE_LIMIT_RETRIES:
+                delay = Config.ETHERSCAN_RATE_LIMIT_BACKOFF * 2 ** attempt
+                logger.warning(f"Etherscan rate limit reached, retrying in {delay}s")
+                time.sleep(delay)
+        
+        logger.error(f"Etherscan rate limit still reached after {Config.ETHERSCAN_RATE_LIMIT_RETRIES} retries")
+        return None
+    
+    def _is_rate_limited(self, data):
+        """Etherscan reports rate limiting as HTTP 200 with status "0" and a rate limit message"""
+        return (
+            isinstance(data, dict) and data.get("status") == "0"
+            and "rate limit" in str(data.get("result", "")).lower()
+        )
+    
+    def _send_request(self, params):
+        """Send a single request to the Etherscan API with error handling"""
+        self.rate_limiter.wait()
         try:
             logger.info(f"Making API request to {self.api_url}")
-            response = requests.get(self.api_url, params=params)
+            response = self.session.get(self.api_url, params=params, timeout=Config.HTTP_TIMEOUT)
             
             if response.status_code != 200:
                 logger.error(f"HTTP Error: Status code {response.status_code}, Response: {response.text}")
@@ -245,9 +663,9 @@ class EtherscanClient:
                 return None
             
             try:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return data
-            except json.JSONDecodeError as e:
+            except orjson.JSONDecodeError as e:
                 logger.error(f"JSON Decode Error: {e}, Response text: {response.text[:200]}...")
                 return None
             
@@ -255,11 +673,15 @@ class EtherscanClient:
             logger.error(f"Request Error: {e}")
             return None
     
-    @lru_cache(maxsize=Config.API_CACHE_SIZE)
-    def get_cached_response(self, params_str):
-        """Cache API responses to reduce API calls"""
-        params = json.loads(params_str)
-        return self._make_request(params)
+    def get_cached_response(self, cache_key, build_params, ttl_seconds=Config.TX_CACHE_TTL):
+        """Cache API responses to reduce API calls, building request params only on a miss"""
+        # Only cache successful lookups, not rate-limit or error responses
+        return response_cache.get_or_set(
+            cache_key,
+            lambda: self._make_request(build_params()),
+            ttl_seconds,
+            cacheable=lambda data: bool(data) and (data.get("status") == "1" or data.get("message") == "No transactions found")
+        )
     
     def resolve_ens(self, ens_name):
         """Resolve an ENS name to an Ethereum address using Etherscan API"""
@@ -285,9 +707,9 @@ class EtherscanClient:
         # Try using a public ENS resolver API
         try:
             url = f"https://api.ensideas.com/ens/resolve/{ens_name}"
-            response = requests.get(url)
+            response = self.session.get(url, timeout=Config.HTTP_TIMEOUT)
             response.raise_for_status()
-            data = response.json()
+            data = orjson.loads(response.content)
             if data and data.get("address"):
                 return data.get("address")
         except Exception as e:
@@ -300,10 +722,11 @@ class EtherscanClient:
         if not address or not chain or chain not in Config.CHAIN_IDS:
             return []
             
-        chain_id = Config.CHAIN_IDS.get(chain)
+        logger.info(f"Fetching transactions for {chain} from block {from_block}")
         
-        params = {
-            "chainid": chain_id,
+        cache_key = ("txlist", address.lower(), chain, from_block)
+        response_data = self.get_cached_response(cache_key, lambda: {
+            "chainid": Config.CHAIN_IDS.get(chain),
             "module": "account",
             "action": "txlist",
             "address": address,
@@ -313,12 +736,7 @@ class EtherscanClient:
             "offset": Config.MAX_TX_LIMIT,
             "sort": "desc",
             "apikey": self.api_key
-        }
-        
-        logger.info(f"Fetching transactions for {chain} with params: {params}")
-        
-        params_str = json.dumps(params)
-        response_data = self.get_cached_response(params_str)
+        })
         
         if not response_data:
             logger.warning(f"No response data for {chain}")
@@ -337,72 +755,60 @@ class EtherscanClient:
         logger.info(f"Found {len(result)} transactions for {address} on {chain}")
         return result
     
-    def get_token_price(self, chain):
-        """Get current token price for a specific chain"""
-        # For Ethereum, we can use the native Etherscan API endpoint for token price
-        if chain == "eth":
-            params = {
+    def get_block_by_time(self, chain, timestamp):
+        """Get the last block mined before a Unix timestamp on a chain"""
+        chain_id = Config.CHAIN_IDS.get(chain)
+        if not chain_id:
+            return None
+        
+        # Cached per chain: a block found for a slightly older cutoff only widens the window
+        data = self.get_cached_response(("blocknobytime", chain), lambda: {
+            "chainid": chain_id,
+            "module": "block",
+            "action": "getblocknobytime",
+            "timestamp": timestamp,
+            "closest": "before",
+            "apikey": self.api_key
+        }, Config.BLOCK_CACHE_TTL)
+        if data and data.get("status") == "1":
+            try:
+                return int(data["result"])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.error(f"Error parsing block number for {chain}: {e}")
+        
+        logger.warning(f"Could not find start block for {chain}")
+        return None
+    
+    def get_eth_price(self):
+        """Get the current ETH price from the Etherscan stats endpoint"""
+        try:
+            data = self.get_cached_response(("ethprice",), lambda: {
                 "chainid": "1",
                 "module": "stats",
                 "action": "ethprice",
                 "apikey": self.api_key
-            }
-            
-            data = self._make_request(params)
+            }, Config.PRICE_PREFETCH_INTERVAL)
             if data and data.get("status") == "1" and data.get("result"):
                 return float(data["result"]["ethusd"])
-        
-        # For other chains, we can try to use token pricing when available
-        # or fallback to CoinGecko as a temporary solution
-        token_symbols = {
-            "eth": "ethereum",
-            "arbitrum": "ethereum",  # Uses ETH
-            "base": "ethereum",      # Uses ETH
-            "optimism": "ethereum",  # Uses ETH
-            "bsc": "binancecoin",
-            "polygon": "matic-network",
-            "zksync": "ethereum",    # Uses ETH
-            "linea": "ethereum"      # Uses ETH
+        except (KeyError, TypeError, ValueError) as e:
+            logger.error(f"Error parsing ETH price from Etherscan: {e}")
+        return 0
+    
+    def get_coingecko_prices(self, coin_ids):
+        """Get USD prices for several CoinGecko IDs in a single request"""
+        params = {
+            "ids": ",".join(coin_ids),
+            "vs_currencies": "usd"
         }
         
-        if chain in token_symbols:
-            symbol = token_symbols[chain]
-            url = f"https://api.coingecko.com/api/v3/simple/price?ids={symbol}&vs_currencies=usd"
-            
-            try:
-                response = requests.get(url)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data and symbol in data and "usd" in data[symbol]:
-                    return data[symbol]["usd"]
-            except Exception as e:
-                logger.error(f"Error fetching price from CoinGecko for {chain}: {e}")
-        
-        # Fallback to cached price or default
-        return price_cache.get(chain) or 0
-
-    def get_token_prices(self):
-        """Get current token prices for all supported chains"""
-        prices = {}
-        
-        # Get current price for each chain's native token
-        for chain in Config.SUPPORTED_CHAINS:
-            try:
-                price = self.get_token_price(chain)
-                if price > 0:
-                    prices[chain] = price
-                    logger.info(f"Price for {chain}: ${price}")
-                else:
-                    logger.warning(f"Failed to get price for {chain}")
-                    # Use previous price if available, otherwise default to 0
-                    prices[chain] = price_cache.get(chain) or 0
-                    
-            except Exception as e:
-                logger.error(f"Error fetching price for {chain}: {e}")
-                prices[chain] = price_cache.get(chain) or 0
-        
-        return prices
+        try:
+            response = self.session.get(Config.COINGECKO_PRICE_URL, params=params, timeout=Config.HTTP_TIMEOUT)
+            response.raise_for_status()
+            data = orjson.loads(response.content)
+            return {coin_id: quote["usd"] for coin_id, quote in data.items() if "usd" in quote}
+        except Exception as e:
+            logger.error(f"Error fetching prices from CoinGecko: {e}")
+            return {}
 
 # Create Etherscan client
 etherscan = EtherscanClient()
@@ -410,40 +816,117 @@ etherscan = EtherscanClient()
 # Create API clients
 moralis = MoralisClient()
 
+# Shared worker pool for concurrent per-chain API requests
+fetch_executor = ThreadPoolExecutor(max_workers=Config.FETCH_WORKERS, thread_name_prefix="mygas-fetch")
+
 # Utility functions
-def refresh_token_prices():
-    """Refresh token prices from API if cache is expired"""
-    if price_cache.is_expired():
-        logger.info("Refreshing token prices...")
-        prices = etherscan.get_token_prices()
-        price_cache.update(prices)
-    return price_cache.cache
-
-def get_native_token_symbol(chain):
-    """Get the native token symbol for a chain"""
-    return Config.NATIVE_TOKENS.get(chain, "GAS")
-
-def get_explorer_url(chain, tx_hash):
-    """Get the blockchain explorer URL for a transaction"""
-    base_url = Config.EXPLORERS.get(chain, "")
-    if base_url and tx_hash:
-        return f"{base_url}{tx_hash}"
-    return ""
+def fetch_token_prices():
+    """Get current token prices for all supported chains"""
+    # One CoinGecko lookup covers every distinct native token; run it
+    # alongside the Etherscan ETH price lookup
+    coin_ids = sorted(set(Config.COINGECKO_IDS.values()))
+    coingecko_future = fetch_executor.submit(etherscan.get_coingecko_prices, coin_ids)
+    eth_price = etherscan.get_eth_price()
+    quotes = coingecko_future.result()
+    
+    # Prefer Etherscan's own ETH price for ETH-based chains
+    if eth_price > 0:
+        quotes["ethereum"] = eth_price
+    
+    # Fill in anything still missing with a single Moralis bulk price request
+    missing = [coin_id for coin_id in coin_ids if not quotes.get(coin_id) and coin_id in Config.MORALIS_PRICE_TOKENS]
+    if missing:
+        logger.info(f"Falling back to Moralis prices for {', '.join(missing)}")
+        token_prices = moralis.get_token_prices([Config.MORALIS_PRICE_TOKENS[coin_id] for coin_id in missing])
+        for coin_id in missing:
+            price = token_prices.get(Config.MORALIS_PRICE_TOKENS[coin_id].lower())
+            if price:
+                quotes[coin_id] = float(price)
+    
+    prices = {}
+    for chain in Config.SUPPORTED_CHAINS:
+        price = quotes.get(Config.COINGECKO_IDS.get(chain), 0)
+        if price > 0:
+            prices[chain] = price
+            logger.info(f"Price for {chain}: ${price}")
+        else:
+            # Zero leaves any cached (possibly stale) price in place
+            logger.warning(f"Failed to get price for {chain}")
+            prices[chain] = 0
+    
+    return prices
+
+def get_current_token_prices():
+    """Get cached token prices, only fetching them inline when the cache is cold"""
+    prices = price_cache.prices()
+    if not prices:
+        # Another worker may already have shared prices
+        price_cache.sync()
+        prices = price_cache.prices()
+    if not prices:
+        # Wait for any fetch already in flight rather than starting another one
+        with price_cache.fetch_lock:
+            prices = price_cache.prices()
+            if not prices and price_cache.cold_fetch_allowed():
+                # Normally the background prefetch keeps prices warm; this covers startup
+                logger.info("Token price cache is cold, fetching prices...")
+                price_cache.update(fetch_token_prices())
+                prices = price_cache.prices()
+    if not prices:
+        # The last fetch failed recently; serve without USD costs until the background retry succeeds
+        logger.warning("No token prices available, USD costs will be zero")
+    return prices
+
+def prefetch_token_prices():
+    """Refresh stale token prices and those about to expire"""
+    try:
+        price_cache.sync()
+        expiring = price_cache.expiring(Config.PRICE_PREFETCH_WINDOW)
+        if expiring and price_cache.claim_refresh():
+            logger.info(f"Prefetching token prices for {', '.join(expiring)}")
+            with price_cache.fetch_lock:
+                price_cache.update(fetch_token_prices())
+    except Exception as e:
+        logger.error(f"Error prefetching token prices: {e}")
+
+def run_price_prefetch():
+    """Keep token prices fresh, checking every PRICE_PREFETCH_INTERVAL seconds"""
+    while True:
+        prefetch_token_prices()
+        time.sleep(Config.PRICE_PREFETCH_INTERVAL)
+
+price_prefetch_thread = None
+price_prefetch_lock = threading.Lock()
+
+def start_price_prefetch():
+    """Start the background price prefetch thread once per process"""
+    global price_prefetch_thread
+    if price_prefetch_thread is not None:
+        return
+    with price_prefetch_lock:
+        if price_prefetch_thread is None:
+            price_prefetch_thread = threading.Thread(target=run_price_prefetch, name="mygas-price-prefetch", daemon=True)
+            price_prefetch_thread.start()
+
+# Start on the first request rather than at import, so only serving processes
+# (not the reloader parent or tools importing the module) make price requests
+@app.before_request
+def ensure_price_prefetch():
+    """Make sure this process keeps token prices fresh"""
+    start_price_prefetch()
 
 def is_valid_ethereum_address(address):
     """Simple validation for Ethereum addresses"""
-    if not address or not isinstance(address, str):
-        return False
-    return address.startswith('0x') and len(address) == 42
+    return isinstance(address, str) and match_address(address) is not None
 
 def validate_address_param(address):
     """Validate and process address parameter"""
     if not address:
         return None, "Address is required"
     
-    # Check if address is ENS name
+    # Check if address is ENS name; ENS names are lowercase, so normalize before resolving
     if address.lower().endswith('.eth'):
-        resolved_address = etherscan.resolve_ens(address)
+        resolved_address = etherscan.resolve_ens(address.lower())
         if not resolved_address:
             return None, f"Could not resolve ENS name: {address}"
         address = resolved_address
@@ -454,75 +937,111 @@ def validate_address_param(address):
     
     return address, None
 
-def get_from_block(days=Config.HISTORY_DAYS):
-    """Estimate a starting block number based on days (rough approximation)"""
-    # Ethereum averages ~6500 blocks per day
-    # This is a simplified approach - you might want to use a more accurate method
-    return 0  # Default to 0 to get all transactions, then filter by date later
+def get_from_block(chain, days=Config.HISTORY_DAYS):
+    """Get the first block of the history window so Etherscan can filter server-side"""
+    cutoff_date = datetime.now() - timedelta(days=days)
+    from_block = etherscan.get_block_by_time(chain, int(cutoff_date.timestamp()))
+    
+    # Default to 0 to get all transactions, then filter by date later
+    return from_block if from_block is not None else 0
 
 def get_from_date(days=Config.HISTORY_DAYS):
-    """Get ISO formatted date string for 'days' ago"""
-    cutoff_date = datetime.now() - timedelta(days=days)
-    return cutoff_date.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    """Get ISO formatted UTC date string for the start of the day 'days' ago"""
+    # Day granularity keeps Moralis cache keys stable; a slightly older cutoff
+    # only widens the window, and process_transactions filters by the exact one
+    cutoff_date = datetime.now(timezone.utc) - timedelta(days=days)
+    return cutoff_date.strftime("%Y-%m-%dT00:00:00Z")
 
-def process_moralis_transaction(tx, cutoff_date):
-    """Process a single Moralis transaction and extract relevant data"""
-    tx_hash = tx.get("hash", "")
-    
-    # Parse timestamp
+def parse_moralis_timestamp(timestamp_str):
+    """Parse a Moralis ISO 8601 block timestamp (UTC) into a Unix timestamp"""
+    # Moralis always sends YYYY-MM-DDTHH:MM:SS[.fff]Z, so slice the fields out directly
+    tx_date = datetime(
+        int(timestamp_str[0:4]), int(timestamp_str[5:7]), int(timestamp_str[8:10]),
+        int(timestamp_str[11:13]), int(timestamp_str[14:16]), int(timestamp_str[17:19]),
+        tzinfo=timezone.utc
+    )
+    return int(tx_date.timestamp())
+
+def parse_moralis_row(tx):
+    """Parse a Moralis transaction into (timestamp, receipt_gas_used, gas_limit, gas_price, transaction_fee)"""
     timestamp_str = tx.get("block_timestamp")
     if not timestamp_str:
-        raise ValueError(f"Missing timestamp in transaction: {tx_hash}")
-        
-    # Parse ISO 8601 timestamp
-    tx_date = datetime.strptime(timestamp_str, "%Y-%m-%dT%H:%M:%S.%fZ")
-    
-    # Skip transactions older than cutoff date
-    if tx_date < cutoff_date:
-        raise ValueError("Transaction too old")
-    
-    # Get gas data
-    gas_used = int(tx.get("receipt_gas_used", "0"))
-    if gas_used == 0:
-        gas_used = int(tx.get("gas", "0"))  # Fall back to gas limit if gas_used not available
+        raise ValueError(f"Missing timestamp in transaction: {tx.get('hash', '')}")
+    return (
+        parse_moralis_timestamp(timestamp_str),
+        int(tx.get("receipt_gas_used") or "0"),
+        int(tx.get("gas") or "0"),
+        int(tx.get("gas_price") or "0"),
+        float(tx.get("transaction_fee") or "0")
+    )
+
+def parse_etherscan_row(tx):
+    """Parse an Etherscan transaction into (timestamp, gas_used, gas_price)"""
+    return int(tx.get("timeStamp") or "0"), int(tx.get("gasUsed") or "0"), int(tx.get("gasPrice") or "0")
+
+def parse_transaction_rows(transactions, parse_row):
+    """Parse each transaction on its own, returning (valid indices, rows) and skipping invalid ones"""
+    valid = []
+    rows = []
+    for i, tx in enumerate(transactions):
+        try:
+            rows.append(parse_row(tx))
+        except (AttributeError, TypeError, ValueError) as e:
+            logger.warning(f"Invalid transaction data: {e}")
+            continue
+        valid.append(i)
+    return np.array(valid, dtype=np.intp), rows
+
+def row_column(rows, index, dtype):
+    """Gather one field of the parsed rows into a NumPy array"""
+    return np.fromiter((row[index] for row in rows), dtype=dtype, count=len(rows))
+
+def extract_moralis_columns(transactions):
+    """Extract valid indices and timestamp, gas used and gas cost columns from Moralis transactions"""
+    valid, rows = parse_transaction_rows(transactions, parse_moralis_row)
+    timestamps = row_column(rows, 0, np.int64)
+    receipt_gas_used = row_column(rows, 1, np.int64)
+    gas_limit = row_column(rows, 2, np.int64)
+    gas_price = row_column(rows, 3, np.float64)
+    transaction_fee = row_column(rows, 4, np.float64)
     
-    # Get gas cost in ETH
-    if tx.get("transaction_fee"):
-        # Use transaction_fee directly from Moralis
-        gas_cost_eth = float(tx.get("transaction_fee"))
-    else:
-        # Fallback calculation
-        gas_price = int(tx.get("gas_price", "0")) / 1e18  # Convert Wei to ETH
-        gas_cost_eth = gas_price * gas_used
+    # Fall back to the gas limit if gas_used is not available
+    gas_used = np.where(receipt_gas_used > 0, receipt_gas_used, gas_limit)
     
-    return tx_hash, tx_date, gas_used, gas_cost_eth
+    # Use transaction_fee directly from Moralis, otherwise gas_price * gas_used converted from Wei
+    gas_cost_eth = np.where(transaction_fee > 0, transaction_fee, gas_price * gas_used / 1e18)
+    return valid, timestamps, gas_used, gas_cost_eth
 
-def process_etherscan_transaction(tx, cutoff_date):
-    """Process a single Etherscan transaction and extract relevant data"""
-    tx_hash = tx.get("hash", "")
+def extract_etherscan_columns(transactions):
+    """Extract valid indices and timestamp, gas used and gas cost columns from Etherscan transactions"""
+    valid, rows = parse_transaction_rows(transactions, parse_etherscan_row)
+    timestamps = row_column(rows, 0, np.int64)
+    gas_used = row_column(rows, 1, np.int64)
+    gas_price = row_column(rows, 2, np.float64)
     
-    # Parse timestamp (Unix timestamp in seconds)
-    timestamp = int(tx.get("timeStamp", "0"))
+    # Calculate gas cost, converting Wei to ETH
+    gas_cost_eth = gas_price * gas_used / 1e18
+    return valid, timestamps, gas_used, gas_cost_eth
+
+def compute_costs(timestamps, gas_cost_eth, cutoff_ts, token_price, token_multiplier):
+    """Select transactions inside the history window and compute their unrounded display amounts and USD costs"""
+    recent = np.flatnonzero(timestamps >= cutoff_ts)
+    recent_cost_eth = gas_cost_eth[recent]
+    return recent, recent_cost_eth * token_multiplier, recent_cost_eth * token_price
+
+def format_tx_time(timestamp, now):
+    """Format a Unix timestamp for display"""
     tx_date = datetime.fromtimestamp(timestamp)
     
     # Handle future timestamps in test data
-    if tx_date > datetime.now():
-        logger.debug(f"Future timestamp detected in transaction {tx_hash}: {timestamp}")
-        tx_date = datetime.now() - timedelta(days=7)  # Set to 7 days ago
-    
-    # Skip transactions older than cutoff date
-    if tx_date < cutoff_date:
-        raise ValueError("Transaction too old")
-    
-    # Calculate gas cost
-    gas_price = int(tx.get("gasPrice", "0")) / 1e18  # Convert Wei to ETH
-    gas_used = int(tx.get("gasUsed", "0"))
-    gas_cost_eth = gas_price * gas_used
+    if tx_date > now:
+        logger.debug(f"Future timestamp detected: {timestamp}")
+        tx_date = now - timedelta(days=7)  # Set to 7 days ago
     
-    return tx_hash, tx_date, gas_used, gas_cost_eth
+    return tx_date.strftime("%Y-%m-%d %H:%M")
 
-def process_transactions(transactions, chain, token_prices, is_moralis=False):
-    """Process transactions to extract gas data"""
+def process_transactions(transactions, chain, token_prices, is_moralis=False, by_chain=None, by_date=None):
+    """Process transactions to extract gas data, adding them to the by_chain/by_date totals when given"""
     result = []
     
     # Handle empty transaction list
@@ -535,105 +1054,222 @@ def process_transactions(transactions, chain, token_prices, is_moralis=False):
     logger.info(f"Using token price for {chain}: {token_price}")
     
     # Get current time to filter transactions from the last 3 months
-    cutoff_date = datetime.now() - timedelta(days=Config.HISTORY_DAYS)
+    now = datetime.now()
+    cutoff_ts = (now - timedelta(days=Config.HISTORY_DAYS)).timestamp()
     
-    processed_count = 0
-    skipped_count = 0
-    error_count = 0
+    # Extract numeric columns with the parser for the data source; invalid transactions are left out
+    extract_columns = extract_moralis_columns if is_moralis else extract_etherscan_columns
+    valid, timestamps, gas_used, gas_cost_eth = extract_columns(transactions)
     
-    # Select the appropriate transaction processor based on data source
-    process_tx = process_moralis_transaction if is_moralis else process_etherscan_transaction
+    # Format data for display, resolving chain details once rather than per transaction
+    chain_display, token_symbol, explorer_base, _, is_eth_based = CHAIN_DISPATCH.get(
+        chain, (chain, "GAS", "", False, False)
+    )
+    token_display = "Gwei" if is_eth_based else token_symbol
+    token_multiplier = 1e9 if is_eth_based else 1.0
     
-    for tx in transactions:
-        try:
-            # Process transaction data
-            tx_hash, tx_date, gas_used, gas_cost_eth = process_tx(tx, cutoff_date)
-            
-            # Format data for display
-            token_symbol = get_native_token_symbol(chain)
-            is_eth_based = token_symbol == "ETH"
-            gas_cost_gwei = gas_cost_eth * 1e9 if is_eth_based else gas_cost_eth
-            
-            # Calculate USD cost using token price
-            usd_cost = gas_cost_eth * token_price
-            
-            # Get token display name and explorer URL
-            token_display = "Gwei" if is_eth_based else token_symbol
-            explorer_url = get_explorer_url(chain, tx_hash)
-            
-            # Format transaction data
-            transaction_data = {
-                "chain": Config.SUPPORTED_CHAINS.get(chain, chain),
-                "tx": tx_hash,
-                "explorer_url": explorer_url,
-                "time": tx_date.strftime("%Y-%m-%d %H:%M"),
-                "gas": gas_used,
-                "token_amount": round(gas_cost_gwei, 9),
-                "token_symbol": token_display,
-                "usd": round(usd_cost, 2)
-            }
-            result.append(transaction_data)
-            processed_count += 1
-            
-        except ValueError as e:
-            # Skip transaction intentionally (too old or missing data)
-            if str(e) == "Transaction too old":
-                skipped_count += 1
-            else:
-                logger.warning(f"Invalid transaction data: {e}")
-                error_count += 1
-            continue
-        except Exception as e:
-            logger.error(f"Error processing transaction: {e}")
-            error_count += 1
-            continue
+    # Skip transactions older than cutoff date and price the rest in one vectorized step
+    recent, token_amounts, usd_costs = compute_costs(timestamps, gas_cost_eth, cutoff_ts, token_price, token_multiplier)
+    
+    # Only build response rows for transactions inside the history window,
+    # converting each column to Python values once instead of indexing NumPy scalars per row.
+    # Rows show values rounded in one vectorized step; totals add up the exact values
+    recent_gas = gas_used[recent]
+    rows = zip(
+        valid[recent].tolist(), timestamps[recent].tolist(), recent_gas.tolist(),
+        np.round(token_amounts, 9).tolist(), np.round(usd_costs, 2).tolist()
+    )
+    append = result.append
+    date_keys = []
+    for i, timestamp, gas, display_amount, display_usd in rows:
+        tx_hash = transactions[i].get("hash", "")
+        tx_time = format_tx_time(timestamp, now)
+        # Date part of the "YYYY-MM-DD HH:MM" display time
+        date_keys.append(tx_time[:10])
+        append({
+            "chain": chain_display,
+            "tx": tx_hash,
+            "explorer_url": f"{explorer_base}{tx_hash}" if explorer_base and tx_hash else "",
+            "time": tx_time,
+            "gas": gas,
+            "token_amount": display_amount,
+            "token_symbol": token_display,
+            "usd": display_usd
+        })
     
-    logger.info(f"Processed {processed_count} transactions for {chain}, skipped {skipped_count}, errors {error_count}")
+    # Aggregate the columns in NumPy rather than updating the totals row by row
+    if result and by_chain is not None:
+        add_gas_total(by_chain[chain_display], int(recent_gas.sum()), float(token_amounts.sum()), token_display, float(usd_costs.sum()))
+    if result and by_date is not None:
+        add_grouped_gas_totals(by_date, date_keys, recent_gas, token_amounts, usd_costs, token_display)
+    
+    logger.info(f"Processed {len(result)} transactions for {chain}, skipped {len(valid) - len(result)}, errors {len(transactions) - len(valid)}")
     return result
 
-def aggregate_by_chain(transactions):
-    """Aggregate gas consumption by chain"""
-    result = {}
-    for tx in transactions:
-        chain = tx["chain"]
-        gas = tx["gas"]
-        token_amount = tx["token_amount"]
-        token_symbol = tx["token_symbol"]
-        usd = tx["usd"]
-        
-        if chain not in result:
-            result[chain] = {"gas": 0, "token_amount": 0, "token_symbol": token_symbol, "usd": 0}
+def new_gas_total():
+    """Create an empty gas consumption accumulator"""
+    return {"gas": 0, "token_amount": 0.0, "token_symbol": None, "usd": 0.0}
+
+def add_gas_total(total, gas, token_amount, token_symbol, usd):
+    """Add one transaction's gas consumption to an accumulator"""
+    total["gas"] += gas
+    total["token_amount"] += token_amount
+    total["token_symbol"] = total["token_symbol"] or token_symbol
+    total["usd"] += usd
+
+def add_grouped_gas_totals(totals, keys, gas, token_amounts, usd_costs, token_symbol):
+    """Add per-transaction columns to the accumulator for each transaction's key, summing groups with np.bincount"""
+    unique_keys, key_index = np.unique(keys, return_inverse=True)
+    count = len(unique_keys)
+    gas_sums = np.bincount(key_index, weights=gas, minlength=count)
+    token_sums = np.bincount(key_index, weights=token_amounts, minlength=count)
+    usd_sums = np.bincount(key_index, weights=usd_costs, minlength=count)
+    for key, gas_sum, token_sum, usd_sum in zip(unique_keys.tolist(), gas_sums.tolist(), token_sums.tolist(), usd_sums.tolist()):
+        add_gas_total(totals[key], int(gas_sum), token_sum, token_symbol, usd_sum)
+
+def new_gas_totals():
+    """Create empty (by_chain, by_date) accumulators for process_transactions"""
+    return defaultdict(new_gas_total), defaultdict(new_gas_total)
+
+def format_gas_totals(by_chain, by_date):
+    """Convert accumulated totals to (gas_blocks, daily_gas) response lists"""
+    # Convert to list format
+    gas_blocks = [{"chain": chain, "gas": data["gas"], "token_amount": round(data["token_amount"], 9), "token_symbol": data["token_symbol"], "usd": round(data["usd"], 2)} for chain, data in by_chain.items()]
+    
+    # Convert daily totals to a list sorted by date for charting (ISO dates need no sort key)
+    daily_gas = [{"date": date, "gas": data["gas"], "token_amount": round(data["token_amount"], 9), "token_symbol": data["token_symbol"], "usd": round(data["usd"], 2)} for date, data in sorted(by_date.items())]
+    
+    return gas_blocks, daily_gas
+
+def find_inactive_chains(address, from_date):
+    """Find chains where the wallet has no transactions since from_date, per one Moralis activity probe"""
+    active = moralis.get_active_chains(address, Config.MORALIS_ACTIVITY_CHAINS.values())
+    if active is None:
+        # Without the probe, fetch every chain
+        return frozenset()
+    
+    inactive = set()
+    for chain_id, moralis_chain in Config.MORALIS_ACTIVITY_CHAINS.items():
+        if moralis_chain not in active:
+            inactive.add(chain_id)
+            continue
+        # Compare ISO timestamps down to the second; a missing timestamp counts as active
+        last_tx = active[moralis_chain]
+        if last_tx and last_tx[:19] < from_date[:19]:
+            inactive.add(chain_id)
+    return frozenset(inactive)
+
+def completed_future(result):
+    """Wrap an already known result in a finished Future"""
+    future = Future()
+    future.set_result(result)
+    return future
+
+def fetch_chain_transactions(address, chain_id, from_date):
+    """Fetch raw transactions for a chain, returning (transactions, is_moralis)"""
+    # Use Moralis API for Base and Optimism chains
+    if chain_id in MORALIS_CHAINS_SET:
+        logger.info(f"Using Moralis API for {chain_id}")
+        return moralis.get_transactions(address, chain_id, from_date), True
+    
+    # Use Etherscan API for other chains, starting at the history window
+    logger.info(f"Using Etherscan API for {chain_id}")
+    from_block = get_from_block(chain_id, Config.HISTORY_DAYS)
+    return etherscan.get_transactions(address, chain_id, from_block), False
+
+def submit_chain_fetches(address):
+    """Start fetching transactions for all supported chains, returning futures keyed by chain"""
+    # Set up time cutoff for Moralis (Etherscan start blocks are resolved per chain)
+    from_date = get_from_date(Config.HISTORY_DAYS)
+    
+    # Skip chains the wallet has not used in the history window
+    inactive = find_inactive_chains(address, from_date)
+    if inactive:
+        logger.info(f"Skipping chains without recent activity: {', '.join(sorted(inactive))}")
+    
+    logger.info(f"Fetching transactions for {len(ACTIVE_CHAINS) - len(inactive)} chains")
+    return {
+        chain_id: (
+            completed_future(([], chain_id in MORALIS_CHAINS_SET)) if chain_id in inactive
+            else fetch_executor.submit(fetch_chain_transactions, address, chain_id, from_date)
+        )
+        for chain_id, _ in ACTIVE_CHAINS
+    }
+
+def collect_chain_transactions(chain_id, future, token_prices, by_chain=None, by_date=None):
+    """Wait for a chain's fetch to finish and return its processed transactions"""
+    chain_name = Config.SUPPORTED_CHAINS.get(chain_id, chain_id)
+    try:
+        transactions, is_moralis = future.result()
+        source = "Moralis" if is_moralis else "Etherscan"
+        if not transactions:
+            logger.info(f"No {source} transactions found for {chain_name}")
+            return []
         
-        result[chain]["gas"] += gas
-        result[chain]["token_amount"] += token_amount
-        result[chain]["usd"] += usd
+        logger.info(f"Processing {len(transactions)} {source} transactions for {chain_name}")
+        processed_transactions = process_transactions(
+            transactions, chain_id, token_prices, is_moralis=is_moralis, by_chain=by_chain, by_date=by_date
+        )
+        if processed_transactions:
+            logger.info(f"Adding {len(processed_transactions)} processed {source} transactions for {chain_name}")
+        else:
+            logger.info(f"No processed {source} transactions for {chain_name}")
+        return processed_transactions
+    except Exception as e:
+        logger.error(f"Error fetching transactions for {chain_name}: {e}", exc_info=True)
+        return []
+
+def json_response(payload, status=200):
+    """Build a JSON response serialized with orjson, gzipped when the client accepts it"""
+    body = orjson.dumps(payload)
+    if len(body) < Config.GZIP_MIN_SIZE:
+        return Response(body, status=status, mimetype='application/json')
     
-    # Convert to list format
-    return [{"chain": chain, "gas": data["gas"], "token_amount": round(data["token_amount"], 9), "token_symbol": data["token_symbol"], "usd": data["usd"]} for chain, data in result.items()]
-
-def format_daily_gas(transactions):
-    """Format daily gas consumption for charting"""
-    # Group transactions by date
-    daily_gas = {}
-    for tx in transactions:
-        date = tx["time"].split(" ")[0]  # Extract date part
-        gas = tx["gas"]
-        token_amount = tx["token_amount"]
-        token_symbol = tx["token_symbol"]
-        usd = tx["usd"]
-        
-        if date not in daily_gas:
-            daily_gas[date] = {"gas": 0, "token_amount": 0, "token_symbol": token_symbol, "usd": 0}
-        
-        daily_gas[date]["gas"] += gas
-        daily_gas[date]["token_amount"] += token_amount
-        daily_gas[date]["usd"] += usd
-    
-    # Convert to list and sort by date
-    result = [{"date": date, "gas": data["gas"], "token_amount": round(data["token_amount"], 9), "token_symbol": data["token_symbol"], "usd": data["usd"]} for date, data in daily_gas.items()]
-    result.sort(key=lambda x: x["date"])
+    headers = {"Vary": "Accept-Encoding"}
+    if request.accept_encodings["gzip"] > 0:
+        body = gzip.compress(body, compresslevel=Config.GZIP_LEVEL)
+        headers["Content-Encoding"] = "gzip"
+    return Response(body, status=status, headers=headers, mimetype='application/json')
+
+def gzip_chunks(chunks):
+    """Gzip a stream of byte chunks, flushing after each so the client receives it right away"""
+    compressor = zlib.compressobj(Config.GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+def json_stream_response(chunks, mimetype='application/json'):
+    """Build a streamed response from byte chunks, gzipped when the client accepts it"""
+    headers = {"Vary": "Accept-Encoding"}
+    if request.accept_encodings["gzip"] > 0:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return Response(stream_with_context(chunks), headers=headers, mimetype=mimetype)
+
+def generate_gas_report(futures, token_prices):
+    """Yield the /api/gas JSON document piece by piece, one chain at a time in display order"""
+    by_chain, by_date = new_gas_totals()
+    all_rows = []
+    tx_count = 0
     
-    return result
+    yield b'{"transactions":{'
+    for chain_id, chain_name in ACTIVE_CHAINS:
+        processed_transactions = collect_chain_transactions(chain_id, futures[chain_id], token_prices, by_chain, by_date)
+        encoded = orjson.dumps(processed_transactions)
+        if processed_transactions:
+            # Keep the encoded rows without their brackets for "All Chains"
+            all_rows.append(encoded[1:-1])
+            tx_count += len(processed_transactions)
+        yield orjson.dumps(chain_name) + b":" + encoded + b","
+    
+    # "All Chains" reuses each chain's encoded rows instead of serializing them again
+    yield b'"All Chains":[' + b",".join(all_rows) + b"]},"
+    
+    # Gas consumption by chain and by day for charting
+    gas_blocks, daily_gas = format_gas_totals(by_chain, by_date)
+    yield b'"dailyGas":' + orjson.dumps(daily_gas) + b',"gasBlocks":' + orjson.dumps(gas_blocks) + b"}"
+    
+    logger.info(f"Returned response with {len(daily_gas)} daily entries, {len(gas_blocks)} gas blocks, {tx_count} transactions")
 
 # API Routes
 @app.route('/api/gas', methods=['GET'])
@@ -647,109 +1283,110 @@ def get_gas_data():
         validated_address, error = validate_address_param(address)
         if error:
             logger.warning(f"Address validation failed: {error}")
-            return jsonify({"error": error}), 400
+            return json_response({"error": error}, 400)
         
         address = validated_address
         logger.info(f"Validated address: {address}")
         
-        # Refresh token prices once for all chains
-        token_prices = refresh_token_prices()
+        # Token prices are kept fresh in the background
+        token_prices = get_current_token_prices()
         logger.info(f"Token prices: {token_prices}")
         
-        all_transactions = []
-        transactions_by_chain = {}
-        
-        # Set up time cutoffs
-        from_block = get_from_block(Config.HISTORY_DAYS)
-        from_date = get_from_date(Config.HISTORY_DAYS)
+        # Fetch transactions for all supported chains concurrently
+        futures = submit_chain_fetches(address)
+    except Exception as e:
+        logger.error(f"Unexpected error in API: {e}", exc_info=True)
+        return json_response({"error": "An unexpected error occurred"}, 500)
+    
+    # Stream the document so each chain is sent as soon as it is processed
+    return json_stream_response(generate_gas_report(futures, token_prices))
+
+@app.route('/api/gas/stream', methods=['GET'])
+def stream_gas_data():
+    """API endpoint streaming gas data as NDJSON, one line per chain as it completes"""
+    try:
+        address = request.args.get('address', '')
+        logger.info(f"Streaming gas data requested for address: {address}")
         
-        # Fetch transactions for each supported chain
-        logger.info(f"Fetching transactions for {len(Config.SUPPORTED_CHAINS)} chains")
-        for chain_id, chain_name in Config.SUPPORTED_CHAINS.items():
-            try:
-                logger.info(f"Fetching transactions for {chain_name} (chain_id: {chain_id})")
-                
-                # Use Moralis API for Base and Optimism chains
-                if chain_id in ["base", "optimism"]:
-                    logger.info(f"Using Moralis API for {chain_name}")
-                    transactions = moralis.get_transactions(address, chain_id, from_date)
-                    if transactions:
-                        logger.info(f"Processing {len(transactions)} Moralis transactions for {chain_name}")
-                        processed_transactions = process_transactions(transactions, chain_id, token_prices, is_moralis=True)
-                        if processed_transactions:
-                            logger.info(f"Adding {len(processed_transactions)} processed Moralis transactions for {chain_name}")
-                            all_transactions.extend(processed_transactions)
-                            transactions_by_chain[chain_name] = processed_transactions
-                        else:
-                            logger.info(f"No processed Moralis transactions for {chain_name}")
-                            transactions_by_chain[chain_name] = []
-                    else:
-                        logger.info(f"No Moralis transactions found for {chain_name}")
-                        transactions_by_chain[chain_name] = []
-                # Use Etherscan API for other chains
-                else:
-                    logger.info(f"Using Etherscan API for {chain_name}")
-                    transactions = etherscan.get_transactions(address, chain_id, from_block)
-                    if transactions:
-                        logger.info(f"Processing {len(transactions)} Etherscan transactions for {chain_name}")
-                        processed_transactions = process_transactions(transactions, chain_id, token_prices)
-                        if processed_transactions:
-                            logger.info(f"Adding {len(processed_transactions)} processed Etherscan transactions for {chain_name}")
-                            all_transactions.extend(processed_transactions)
-                            transactions_by_chain[chain_name] = processed_transactions
-                        else:
-                            logger.info(f"No processed Etherscan transactions for {chain_name}")
-                            transactions_by_chain[chain_name] = []
-                    else:
-                        logger.info(f"No Etherscan transactions found for {chain_name}")
-                        transactions_by_chain[chain_name] = []
-            except Exception as e:
-                logger.error(f"Error fetching transactions for {chain_name}: {e}", exc_info=True)
-                transactions_by_chain[chain_name] = []
-                continue
-        
-        # Add "All Chains" category
-        transactions_by_chain["All Chains"] = all_transactions
-        
-        # Aggregate gas consumption by chain
-        logger.info(f"Aggregating gas consumption for {len(all_transactions)} transactions")
-        gas_blocks = aggregate_by_chain(all_transactions)
-        
-        # Format daily gas consumption for charting
-        logger.info("Formatting daily gas consumption")
-        daily_gas = format_daily_gas(all_transactions)
-        
-        # Return the response, with fallbacks for empty data
-        response = {
-            "dailyGas": daily_gas if daily_gas else [],
-            "gasBlocks": gas_blocks if gas_blocks else [],
-            "transactions": transactions_by_chain if transactions_by_chain else {"All Chains": []}
-        }
+        # Validate and process address
+        validated_address, error = validate_address_param(address)
+        if error:
+            logger.warning(f"Address validation failed: {error}")
+            return json_response({"error": error}, 400)
         
-        logger.info(f"Returning response with {len(daily_gas)} daily entries, {len(gas_blocks)} gas blocks, {len(all_transactions)} transactions")
-        return jsonify(response)
+        token_prices = get_current_token_prices()
+        futures = submit_chain_fetches(validated_address)
     except Exception as e:
         logger.error(f"Unexpected error in API: {e}", exc_info=True)
-        return jsonify({"error": "An unexpected error occurred"}), 500
+        return json_response({"error": "An unexpected error occurred"}, 500)
+    
+    def generate():
+        by_chain, by_date = new_gas_totals()
+        chain_ids = {future: chain_id for chain_id, future in futures.items()}
+        
+        # Emit each chain as soon as its fetch completes
+        for future in as_completed(chain_ids):
+            chain_id = chain_ids[future]
+            processed_transactions = collect_chain_transactions(chain_id, future, token_prices, by_chain, by_date)
+            yield orjson.dumps({
+                "chain": Config.SUPPORTED_CHAINS.get(chain_id, chain_id),
+                "transactions": processed_transactions
+            }) + b"\n"
+        
+        # Finish with the aggregates over all chains
+        gas_blocks, daily_gas = format_gas_totals(by_chain, by_date)
+        yield orjson.dumps({
+            "dailyGas": daily_gas,
+            "gasBlocks": gas_blocks
+        }) + b"\n"
+    
+    return json_stream_response(generate(), mimetype='application/x-ndjson')
 
-@app.route('/')
-def index():
-    """Serve the HTML file"""
+@app.route('/healthz')
+def healthz():
+    """Health check exposing cache freshness for monitoring"""
+    return json_response({
+        "status": "ok",
+        "priceCacheAge": price_cache.age(),
+        "cachedPrices": len(price_cache.prices()),
+        "responseCache": {
+            "size": len(response_cache.entries),
+            "hits": response_cache.hits,
+            "misses": response_cache.misses
+        }
+    })
+
+def load_index_html():
+    """Read the frontend page once so requests are served from memory"""
     try:
-        with open('index.html', 'r') as file:
+        with open('index.html', 'rb') as file:
             return file.read()
     except FileNotFoundError:
         logger.error("index.html file not found")
+        return None
+
+INDEX_HTML = load_index_html()
+INDEX_ETAG = hashlib.md5(INDEX_HTML).hexdigest() if INDEX_HTML is not None else None
+
+@app.route('/')
+def index():
+    """Serve the HTML file"""
+    if INDEX_HTML is None:
         return "Index file not found", 404
+    response = Response(INDEX_HTML, mimetype='text/html')
+    response.set_etag(INDEX_ETAG)
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.INDEX_CACHE_MAX_AGE
+    return response.make_conditional(request)
 
 # Error handlers
 @app.errorhandler(404)
 def not_found(error):
-    return jsonify({"error": "Not found"}), 404
+    return json_response({"error": "Not found"}, 404)
 
 @app.errorhandler(500)
 def server_error(error):
-    return jsonify({"error": "Internal server error"}), 500
+    return json_response({"error": "Internal server error"}, 500)
 
 # Main entry point
 if __name__ == '__main__':
@@ -765,5 +1402,11 @@ if __name__ == '__main__':
         logger.error(f"Missing required environment variables: {', '.join(missing_keys)}")
         print(f"Error: Missing required environment variables: {', '.join(missing_keys)}")
         exit(1)
-        
+    
+    # The dev server handles one request at a time; production runs under Gunicorn
+    if not Config.FLASK_DEV:
+        logger.error("Refusing to start the development server without FLASK_DEV=1")
+        print("Error: Run `gunicorn app:app` in production, or set FLASK_DEV=1 for the development server")
+        exit(1)
+    
     app.run(port=5001, debug=True) 
\ No newline at end of file
@@ -0,0 +1,16 @@
+"""Gunicorn configuration for serving MyGas in production"""
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:5001")
+
+# Requests spend almost all their time waiting on upstream APIs, so threaded
+# workers let each process serve many requests concurrently. Caches live per
+# process, so prefer a few workers with many threads over many workers.
+worker_class = "gthread"
+# app.py reads the same variable to split the Etherscan rate limit between workers
+workers = int(os.getenv("GUNICORN_WORKERS", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# Keep client connections open between requests
+keepalive = 60
+timeout = 60